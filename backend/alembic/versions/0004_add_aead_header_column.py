@@ -0,0 +1,59 @@
+"""Add packed aead_header column to secrets
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16
+
+Adds secrets.aead_header, a single 28-byte column holding iv || auth_tag.
+The IV (12 bytes) and auth tag (16 bytes) are always read and cleared
+together, so packing them saves a per-row column header.
+
+Existing rows are backfilled from the iv and auth_tag columns, which are
+dropped in the follow-up migration 0005.
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: str | None = "0003"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "secrets",
+        sa.Column("aead_header", sa.LargeBinary(28), nullable=True),
+    )
+
+    # Backfill rows that still hold ciphertext (cleared rows stay NULL)
+    connection = op.get_bind()
+    secrets_table = sa.table(
+        "secrets",
+        sa.column("id", sa.String),
+        sa.column("iv", sa.LargeBinary),
+        sa.column("auth_tag", sa.LargeBinary),
+        sa.column("aead_header", sa.LargeBinary),
+    )
+
+    result = connection.execute(
+        sa.select(secrets_table.c.id, secrets_table.c.iv, secrets_table.c.auth_tag).where(
+            secrets_table.c.iv.is_not(None),
+            secrets_table.c.auth_tag.is_not(None),
+        )
+    )
+    for row in result.fetchall():
+        connection.execute(
+            secrets_table.update()
+            .where(secrets_table.c.id == row.id)
+            .values(aead_header=row.iv + row.auth_tag)
+        )
+
+
+def downgrade() -> None:
+    op.drop_column("secrets", "aead_header")
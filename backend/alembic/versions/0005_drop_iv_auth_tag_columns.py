@@ -0,0 +1,53 @@
+"""Drop iv and auth_tag columns from secrets
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-16
+
+Contract step for 0004: iv and auth_tag now live in secrets.aead_header.
+Downgrade restores the columns and unpacks them from aead_header.
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: str | None = "0004"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("secrets") as batch_op:
+        batch_op.drop_column("auth_tag")
+        batch_op.drop_column("iv")
+
+
+def downgrade() -> None:
+    op.add_column("secrets", sa.Column("iv", sa.LargeBinary(12), nullable=True))
+    op.add_column("secrets", sa.Column("auth_tag", sa.LargeBinary(16), nullable=True))
+
+    connection = op.get_bind()
+    secrets_table = sa.table(
+        "secrets",
+        sa.column("id", sa.String),
+        sa.column("iv", sa.LargeBinary),
+        sa.column("auth_tag", sa.LargeBinary),
+        sa.column("aead_header", sa.LargeBinary),
+    )
+
+    result = connection.execute(
+        sa.select(secrets_table.c.id, secrets_table.c.aead_header).where(
+            secrets_table.c.aead_header.is_not(None)
+        )
+    )
+    for row in result.fetchall():
+        connection.execute(
+            secrets_table.update()
+            .where(secrets_table.c.id == row.id)
+            .values(iv=row.aead_header[:12], auth_tag=row.aead_header[12:])
+        )
@@ -1,11 +1,25 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
 
 from app.config import settings
 
+
+def get_connect_args(database_url: str) -> dict:
+    """Driver-specific DBAPI connect arguments for the given database URL."""
+    drivername = make_url(database_url).drivername
+    if drivername.startswith("sqlite"):
+        return {"check_same_thread": False}
+    if drivername == "postgresql+psycopg":
+        # psycopg 3: server-side prepare statements after their first execution, so the
+        # hot token-prefix lookups skip parse/plan on every request
+        return {"prepare_threshold": 1}
+    return {}
+
+
 engine = create_engine(
     settings.database_url,
-    connect_args={"check_same_thread": False},  # SQLite specific
+    connect_args=get_connect_args(settings.database_url),
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -6,6 +6,11 @@ from sqlalchemy.orm import Mapped, mapped_column
 
 from app.database import Base
 
+# AES-GCM parameters packed into Secret.aead_header as iv || auth_tag
+IV_LENGTH = 12
+AUTH_TAG_LENGTH = 16
+AEAD_HEADER_LENGTH = IV_LENGTH + AUTH_TAG_LENGTH
+
 
 class Secret(Base):
     __tablename__ = "secrets"
@@ -22,9 +27,11 @@ class Secret(Base):
     decrypt_token_hash: Mapped[str] = mapped_column(String(128), unique=True, nullable=False)
 
     # Encrypted payload (nullable for cleared secrets)
+    # iv and auth_tag are always read and cleared together, so they share one column
     ciphertext: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
-    iv: Mapped[bytes | None] = mapped_column(LargeBinary(12), nullable=True)
-    auth_tag: Mapped[bytes | None] = mapped_column(LargeBinary(16), nullable=True)
+    aead_header: Mapped[bytes | None] = mapped_column(
+        LargeBinary(AEAD_HEADER_LENGTH), nullable=True
+    )
 
     # Timing (stored as naive datetimes in UTC, serialized with Z suffix)
     unlock_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
@@ -38,3 +45,17 @@ class Secret(Base):
     # Metadata
     ciphertext_size: Mapped[int] = mapped_column(Integer, nullable=False)
     is_deleted: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+
+    @property
+    def iv(self) -> bytes | None:
+        """The 12-byte AES-GCM IV, sliced from aead_header."""
+        if self.aead_header is None:
+            return None
+        return self.aead_header[:IV_LENGTH]
+
+    @property
+    def auth_tag(self) -> bytes | None:
+        """The 16-byte AES-GCM auth tag, sliced from aead_header."""
+        if self.aead_header is None:
+            return None
+        return self.aead_header[IV_LENGTH:]
@@ -13,12 +13,13 @@ def compute_payload_hash(ciphertext_b64: str, iv_b64: str, auth_tag_b64: str) ->
     """
     Compute SHA-256 hash of the payload for PoW binding verification.
 
-    Hash is computed over: ciphertext || iv || auth_tag (raw bytes)
+    Hash is computed over: ciphertext || iv || auth_tag (raw bytes), fed to the
+    hash incrementally so a large ciphertext is never copied into a concatenation.
     """
-    ciphertext = base64.b64decode(ciphertext_b64)
-    iv = base64.b64decode(iv_b64)
-    auth_tag = base64.b64decode(auth_tag_b64)
-    return hashlib.sha256(ciphertext + iv + auth_tag).hexdigest()
+    sha = hashlib.sha256(base64.b64decode(ciphertext_b64))
+    sha.update(base64.b64decode(iv_b64))
+    sha.update(base64.b64decode(auth_tag_b64))
+    return sha.hexdigest()
 
 
 def compute_expected_difficulty(ciphertext_size: int) -> int:
@@ -36,8 +36,7 @@ def create_secret(
 
     secret = Secret(
         ciphertext=ciphertext,
-        iv=iv,
-        auth_tag=auth_tag,
+        aead_header=iv + auth_tag,
         unlock_at=unlock_at,
         expires_at=expires_at,
         edit_token_prefix=get_token_prefix(edit_token),
@@ -181,8 +180,7 @@ def retrieve_secret(db: Session, secret: Secret) -> dict:
     secret.retrieved_at = now
     secret.is_deleted = True
     secret.ciphertext = None
-    secret.iv = None
-    secret.auth_tag = None
+    secret.aead_header = None
     secret.cleared_at = now
     db.commit()
 
@@ -237,9 +235,12 @@ def clear_expired_secrets(db: Session) -> int:
 
     And haven't been cleared yet (cleared_at IS NULL).
 
-    Sets ciphertext/iv/auth_tag to None and cleared_at to current time.
+    Sets ciphertext/aead_header to None and cleared_at to current time.
     Rows are never deleted - metadata is preserved for analytics.
 
+    The filter and the cleared_at stamp share one naive-UTC timestamp taken in
+    Python, the same clock that stamps retrieved_at.
+
     Returns the count of cleared secrets.
     """
     from sqlalchemy import or_
@@ -258,8 +259,7 @@ def clear_expired_secrets(db: Session) -> int:
         .update(
             {
                 "ciphertext": None,
-                "iv": None,
-                "auth_tag": None,
+                "aead_header": None,
                 "cleared_at": now,
             }
         )
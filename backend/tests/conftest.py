@@ -1,3 +1,6 @@
+import hashlib
+import ssl
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
@@ -5,20 +8,60 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
 import app.main as main_module
+from app.config import settings
 from app.database import Base, get_db
 from app.main import app
 from app.middleware.rate_limit import limiter
+from tests.test_utils import generate_test_data, solve_pow
 
+# Tests don't need production-strength PoW: 8 bits keeps each solve to a few hundred
+# hashes while an arbitrary counter still fails verification ~99.6% of the time.
+TEST_POW_BASE_DIFFICULTY = 8
 
-@pytest.fixture
-def db_session():
-    """Create a fresh in-memory database for each test."""
+
+def _cpu_sha_extensions() -> str:
+    """Report whether the CPU advertises SHA-256 instructions (Linux only)."""
+    try:
+        with open("/proc/cpuinfo") as f:
+            flags = f.read().split()
+    except OSError:
+        return "unknown"
+    # x86 lists SHA-NI as "sha_ni"; ARMv8 lists the SHA-256 instructions as "sha2".
+    return "yes" if "sha_ni" in flags or "sha2" in flags else "no"
+
+
+def pytest_report_header(config):
+    """Show which SHA-256 backend the PoW solver in the tests is hashing with."""
+    # hashlib dispatches to OpenSSL's SHA-NI / ARMv8 SHA2 code paths when the CPU has them;
+    # check with `openssl speed -evp sha256` if PoW-heavy tests are unexpectedly slow.
+    if type(hashlib.sha256()).__module__ == "_hashlib":
+        return f"sha256: {ssl.OPENSSL_VERSION}, CPU SHA extensions: {_cpu_sha_extensions()}"
+    return "sha256: CPython builtin (no OpenSSL hardware acceleration)"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def low_pow_difficulty():
+    """Lower the PoW base difficulty for the whole test session."""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(settings, "pow_base_difficulty", TEST_POW_BASE_DIFFICULTY)
+        yield
+
+
+def make_test_engine():
+    """Create an in-memory SQLite engine with the full schema."""
     engine = create_engine(
         "sqlite:///:memory:",
         connect_args={"check_same_thread": False},
         poolclass=StaticPool,
     )
     Base.metadata.create_all(bind=engine)
+    return engine
+
+
+@pytest.fixture
+def db_session():
+    """Create a fresh in-memory database for each test."""
+    engine = make_test_engine()
     TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
     session = TestingSessionLocal()
@@ -29,8 +72,24 @@ def db_session():
         Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture(scope="session")
+def app_client():
+    """One TestClient, and so one app startup/shutdown, shared by the whole session."""
+    # check_database_tables() runs at startup and needs a database that has the schema
+    startup_engine = make_test_engine()
+    original_engine = main_module.engine
+    main_module.engine = startup_engine
+
+    try:
+        with TestClient(app) as test_client:
+            yield test_client
+    finally:
+        main_module.engine = original_engine
+        startup_engine.dispose()
+
+
 @pytest.fixture
-def client(db_session):
+def client(app_client, db_session):
     """Create a test client with the test database and disabled rate limiting."""
 
     def override_get_db():
@@ -44,13 +103,31 @@ def client(db_session):
     # Disable rate limiting for tests
     limiter.enabled = False
 
-    # Override the engine used by check_database_tables() so it checks the test database
-    original_engine = main_module.engine
-    main_module.engine = db_session.get_bind()
-
-    with TestClient(app) as test_client:
-        yield test_client
+    yield app_client
 
+    app_client.cookies.clear()
     app.dependency_overrides.clear()
     limiter.enabled = True
-    main_module.engine = original_engine
+
+
+@pytest.fixture
+def payload():
+    """Fresh test cryptographic data for one secret."""
+    return generate_test_data()
+
+
+@pytest.fixture
+def payload_hash(payload):
+    """PoW binding hash of the `payload` fixture."""
+    return payload.payload_hash
+
+
+@pytest.fixture
+def solved_challenge(client, payload, payload_hash):
+    """A PoW challenge issued for `payload` and its solving counter, as (challenge, counter)."""
+    response = client.post(
+        "/api/v1/challenges",
+        json={"payload_hash": payload_hash, "ciphertext_size": len(payload.ciphertext_bytes)},
+    )
+    challenge = response.json()
+    return challenge, solve_pow(challenge["nonce"], challenge["difficulty"], payload_hash)
@@ -1,9 +1,9 @@
 """Comprehensive tests for capability tokens."""
 
-import base64
 import secrets
 from datetime import UTC, datetime, timedelta
-from unittest.mock import patch
+
+import pytest
 
 from app.config import settings
 from app.services.capability_token_service import (
@@ -12,36 +12,24 @@ from app.services.capability_token_service import (
     find_capability_token,
     validate_capability_token,
 )
-
-
-def generate_test_data(size: int = 100):
-    """Generate test cryptographic data."""
-    iv = secrets.token_bytes(12)
-    auth_tag = secrets.token_bytes(16)
-    ciphertext = secrets.token_bytes(size)
-    edit_token = secrets.token_hex(32)
-    decrypt_token = secrets.token_hex(32)
-
-    return {
-        "ciphertext": base64.b64encode(ciphertext).decode(),
-        "iv": base64.b64encode(iv).decode(),
-        "auth_tag": base64.b64encode(auth_tag).decode(),
-        "edit_token": edit_token,
-        "decrypt_token": decrypt_token,
-    }
+from tests.test_utils import generate_test_data
 
 
 class TestCapabilityTokenCreation:
     """Tests for capability token creation endpoint."""
 
+    @pytest.fixture(autouse=True)
+    def internal_api_key(self, monkeypatch):
+        """Configure the internal API key the endpoint checks against."""
+        monkeypatch.setattr(settings, "internal_api_key", "test-api-key")
+
     def test_create_token_valid_tier(self, client, db_session):
         """Test creating a token with valid tier."""
-        with patch.object(settings, "internal_api_key", "test-api-key"):
-            response = client.post(
-                "/api/v1/capability-tokens",
-                json={"tier": "basic"},
-                headers={"X-API-Key": "test-api-key"},
-            )
+        response = client.post(
+            "/api/v1/capability-tokens",
+            json={"tier": "basic"},
+            headers={"X-API-Key": "test-api-key"},
+        )
 
         assert response.status_code == 201
         data = response.json()
@@ -57,73 +45,68 @@ class TestCapabilityTokenCreation:
         tiers = ["basic", "standard", "large"]
         expected_sizes = [10_000_000, 100_000_000, 500_000_000]
 
-        with patch.object(settings, "internal_api_key", "test-api-key"):
-            for tier, expected_size in zip(tiers, expected_sizes):
-                response = client.post(
-                    "/api/v1/capability-tokens",
-                    json={"tier": tier},
-                    headers={"X-API-Key": "test-api-key"},
-                )
-                assert response.status_code == 201
-                assert response.json()["max_file_size_bytes"] == expected_size
-
-    def test_create_token_invalid_tier(self, client, db_session):
-        """Test creating a token with invalid tier."""
-        with patch.object(settings, "internal_api_key", "test-api-key"):
+        for tier, expected_size in zip(tiers, expected_sizes):
             response = client.post(
                 "/api/v1/capability-tokens",
-                json={"tier": "premium"},  # Invalid tier
+                json={"tier": tier},
                 headers={"X-API-Key": "test-api-key"},
             )
+            assert response.status_code == 201
+            assert response.json()["max_file_size_bytes"] == expected_size
+
+    def test_create_token_invalid_tier(self, client, db_session):
+        """Test creating a token with invalid tier."""
+        response = client.post(
+            "/api/v1/capability-tokens",
+            json={"tier": "premium"},  # Invalid tier
+            headers={"X-API-Key": "test-api-key"},
+        )
 
         assert response.status_code == 422  # Validation error from Pydantic
 
     def test_create_token_missing_api_key(self, client, db_session):
         """Test creating a token without API key."""
-        with patch.object(settings, "internal_api_key", "test-api-key"):
-            response = client.post(
-                "/api/v1/capability-tokens",
-                json={"tier": "basic"},
-            )
+        response = client.post(
+            "/api/v1/capability-tokens",
+            json={"tier": "basic"},
+        )
 
         assert response.status_code == 422  # Missing required header
 
     def test_create_token_wrong_api_key(self, client, db_session):
         """Test creating a token with wrong API key."""
-        with patch.object(settings, "internal_api_key", "test-api-key"):
-            response = client.post(
-                "/api/v1/capability-tokens",
-                json={"tier": "basic"},
-                headers={"X-API-Key": "wrong-key"},
-            )
+        response = client.post(
+            "/api/v1/capability-tokens",
+            json={"tier": "basic"},
+            headers={"X-API-Key": "wrong-key"},
+        )
 
         assert response.status_code == 401
         assert "Invalid API key" in response.json()["detail"]
 
-    def test_create_token_not_configured(self, client, db_session):
+    def test_create_token_not_configured(self, client, db_session, monkeypatch):
         """Test creating a token when API key is not configured."""
-        with patch.object(settings, "internal_api_key", None):
-            response = client.post(
-                "/api/v1/capability-tokens",
-                json={"tier": "basic"},
-                headers={"X-API-Key": "any-key"},
-            )
+        monkeypatch.setattr(settings, "internal_api_key", None)
+        response = client.post(
+            "/api/v1/capability-tokens",
+            json={"tier": "basic"},
+            headers={"X-API-Key": "any-key"},
+        )
 
         assert response.status_code == 503
         assert "not configured" in response.json()["detail"]
 
     def test_create_token_with_payment_info(self, client, db_session):
         """Test creating a token with payment information."""
-        with patch.object(settings, "internal_api_key", "test-api-key"):
-            response = client.post(
-                "/api/v1/capability-tokens",
-                json={
-                    "tier": "standard",
-                    "payment_provider": "lightning",
-                    "payment_reference": "inv_123456",
-                },
-                headers={"X-API-Key": "test-api-key"},
-            )
+        response = client.post(
+            "/api/v1/capability-tokens",
+            json={
+                "tier": "standard",
+                "payment_provider": "lightning",
+                "payment_reference": "inv_123456",
+            },
+            headers={"X-API-Key": "test-api-key"},
+        )
 
         assert response.status_code == 201
 
@@ -142,17 +125,16 @@ class TestCapabilityTokenCreation:
             "generated_by": "admin",
         }
 
-        with patch.object(settings, "internal_api_key", "test-api-key"):
-            response = client.post(
-                "/api/v1/capability-tokens",
-                json={
-                    "tier": "basic",
-                    "payment_provider": "github-actions",
-                    "payment_reference": "run_12345",
-                    "token_metadata": test_metadata,
-                },
-                headers={"X-API-Key": "test-api-key"},
-            )
+        response = client.post(
+            "/api/v1/capability-tokens",
+            json={
+                "tier": "basic",
+                "payment_provider": "github-actions",
+                "payment_reference": "run_12345",
+                "token_metadata": test_metadata,
+            },
+            headers={"X-API-Key": "test-api-key"},
+        )
 
         assert response.status_code == 201
 
@@ -168,12 +150,11 @@ class TestCapabilityTokenCreation:
 
     def test_create_token_without_metadata(self, client, db_session):
         """Test creating a token without metadata (should be None)."""
-        with patch.object(settings, "internal_api_key", "test-api-key"):
-            response = client.post(
-                "/api/v1/capability-tokens",
-                json={"tier": "basic"},
-                headers={"X-API-Key": "test-api-key"},
-            )
+        response = client.post(
+            "/api/v1/capability-tokens",
+            json={"tier": "basic"},
+            headers={"X-API-Key": "test-api-key"},
+        )
 
         assert response.status_code == 201
 
@@ -270,17 +251,18 @@ class TestSecretCreationWithToken:
         token_model, raw_token = create_capability_token(db_session, "basic")
         test_data = generate_test_data()
 
-        unlock_at = (datetime.now(UTC) + timedelta(hours=1)).isoformat()
-        expires_at = (datetime.now(UTC) + timedelta(days=30)).isoformat()
+        now = datetime.now(UTC)
+        unlock_at = (now + timedelta(hours=1)).isoformat()
+        expires_at = (now + timedelta(days=30)).isoformat()
 
         response = client.post(
             "/api/v1/secrets",
             json={
-                "ciphertext": test_data["ciphertext"],
-                "iv": test_data["iv"],
-                "auth_tag": test_data["auth_tag"],
-                "edit_token": test_data["edit_token"],
-                "decrypt_token": test_data["decrypt_token"],
+                "ciphertext": test_data.ciphertext,
+                "iv": test_data.iv,
+                "auth_tag": test_data.auth_tag,
+                "edit_token": test_data.edit_token,
+                "decrypt_token": test_data.decrypt_token,
                 "unlock_at": unlock_at,
                 "expires_at": expires_at,
                 # No pow_proof!
@@ -302,18 +284,19 @@ class TestSecretCreationWithToken:
         token_model, raw_token = create_capability_token(db_session, "basic")
         test_data = generate_test_data()
 
-        unlock_at = (datetime.now(UTC) + timedelta(hours=1)).isoformat()
-        expires_at = (datetime.now(UTC) + timedelta(days=30)).isoformat()
+        now = datetime.now(UTC)
+        unlock_at = (now + timedelta(hours=1)).isoformat()
+        expires_at = (now + timedelta(days=30)).isoformat()
 
         # First creation should succeed
         response1 = client.post(
             "/api/v1/secrets",
             json={
-                "ciphertext": test_data["ciphertext"],
-                "iv": test_data["iv"],
-                "auth_tag": test_data["auth_tag"],
-                "edit_token": test_data["edit_token"],
-                "decrypt_token": test_data["decrypt_token"],
+                "ciphertext": test_data.ciphertext,
+                "iv": test_data.iv,
+                "auth_tag": test_data.auth_tag,
+                "edit_token": test_data.edit_token,
+                "decrypt_token": test_data.decrypt_token,
                 "unlock_at": unlock_at,
                 "expires_at": expires_at,
             },
@@ -328,11 +311,11 @@ class TestSecretCreationWithToken:
         response2 = client.post(
             "/api/v1/secrets",
             json={
-                "ciphertext": test_data2["ciphertext"],
-                "iv": test_data2["iv"],
-                "auth_tag": test_data2["auth_tag"],
-                "edit_token": test_data2["edit_token"],
-                "decrypt_token": test_data2["decrypt_token"],
+                "ciphertext": test_data2.ciphertext,
+                "iv": test_data2.iv,
+                "auth_tag": test_data2.auth_tag,
+                "edit_token": test_data2.edit_token,
+                "decrypt_token": test_data2.decrypt_token,
                 "unlock_at": unlock_at,
                 "expires_at": expires_at,
             },
@@ -342,24 +325,26 @@ class TestSecretCreationWithToken:
         assert "Invalid or consumed" in response2.json()["detail"]
 
     def test_create_secret_size_limit_enforced(self, client, db_session):
-        """Test that file size limits are enforced per tier."""
-        # Create a basic tier token (10MB limit)
+        """Test that a token's file size limit is enforced."""
         token_model, raw_token = create_capability_token(db_session, "basic")
+        # Shrink this token's limit so the test doesn't have to upload 10MB+
+        token_model.max_file_size_bytes = 1000
+        db_session.commit()
 
-        # Generate data larger than 10MB (using 15MB)
-        test_data = generate_test_data(size=15_000_000)
+        test_data = generate_test_data(size=1001)
 
-        unlock_at = (datetime.now(UTC) + timedelta(hours=1)).isoformat()
-        expires_at = (datetime.now(UTC) + timedelta(days=30)).isoformat()
+        now = datetime.now(UTC)
+        unlock_at = (now + timedelta(hours=1)).isoformat()
+        expires_at = (now + timedelta(days=30)).isoformat()
 
         response = client.post(
             "/api/v1/secrets",
             json={
-                "ciphertext": test_data["ciphertext"],
-                "iv": test_data["iv"],
-                "auth_tag": test_data["auth_tag"],
-                "edit_token": test_data["edit_token"],
-                "decrypt_token": test_data["decrypt_token"],
+                "ciphertext": test_data.ciphertext,
+                "iv": test_data.iv,
+                "auth_tag": test_data.auth_tag,
+                "edit_token": test_data.edit_token,
+                "decrypt_token": test_data.decrypt_token,
                 "unlock_at": unlock_at,
                 "expires_at": expires_at,
             },
@@ -376,22 +361,23 @@ class TestSecretCreationWithToken:
     def test_create_secret_expired_token(self, client, db_session):
         """Test creating a secret with an expired token."""
         token_model, raw_token = create_capability_token(db_session, "basic")
+        now = datetime.now(UTC)
         # Manually expire the token
-        token_model.expires_at = datetime.now(UTC).replace(tzinfo=None) - timedelta(days=1)
+        token_model.expires_at = now.replace(tzinfo=None) - timedelta(days=1)
         db_session.commit()
 
         test_data = generate_test_data()
-        unlock_at = (datetime.now(UTC) + timedelta(hours=1)).isoformat()
-        expires_at = (datetime.now(UTC) + timedelta(days=30)).isoformat()
+        unlock_at = (now + timedelta(hours=1)).isoformat()
+        expires_at = (now + timedelta(days=30)).isoformat()
 
         response = client.post(
             "/api/v1/secrets",
             json={
-                "ciphertext": test_data["ciphertext"],
-                "iv": test_data["iv"],
-                "auth_tag": test_data["auth_tag"],
-                "edit_token": test_data["edit_token"],
-                "decrypt_token": test_data["decrypt_token"],
+                "ciphertext": test_data.ciphertext,
+                "iv": test_data.iv,
+                "auth_tag": test_data.auth_tag,
+                "edit_token": test_data.edit_token,
+                "decrypt_token": test_data.decrypt_token,
                 "unlock_at": unlock_at,
                 "expires_at": expires_at,
             },
@@ -404,17 +390,18 @@ class TestSecretCreationWithToken:
     def test_create_secret_invalid_token_format(self, client, db_session):
         """Test creating a secret with invalid token format."""
         test_data = generate_test_data()
-        unlock_at = (datetime.now(UTC) + timedelta(hours=1)).isoformat()
-        expires_at = (datetime.now(UTC) + timedelta(days=30)).isoformat()
+        now = datetime.now(UTC)
+        unlock_at = (now + timedelta(hours=1)).isoformat()
+        expires_at = (now + timedelta(days=30)).isoformat()
 
         response = client.post(
             "/api/v1/secrets",
             json={
-                "ciphertext": test_data["ciphertext"],
-                "iv": test_data["iv"],
-                "auth_tag": test_data["auth_tag"],
-                "edit_token": test_data["edit_token"],
-                "decrypt_token": test_data["decrypt_token"],
+                "ciphertext": test_data.ciphertext,
+                "iv": test_data.iv,
+                "auth_tag": test_data.auth_tag,
+                "edit_token": test_data.edit_token,
+                "decrypt_token": test_data.decrypt_token,
                 "unlock_at": unlock_at,
                 "expires_at": expires_at,
             },
@@ -427,17 +414,18 @@ class TestSecretCreationWithToken:
     def test_create_secret_requires_pow_or_token(self, client, db_session):
         """Test that either PoW or capability token is required."""
         test_data = generate_test_data()
-        unlock_at = (datetime.now(UTC) + timedelta(hours=1)).isoformat()
-        expires_at = (datetime.now(UTC) + timedelta(days=30)).isoformat()
+        now = datetime.now(UTC)
+        unlock_at = (now + timedelta(hours=1)).isoformat()
+        expires_at = (now + timedelta(days=30)).isoformat()
 
         response = client.post(
             "/api/v1/secrets",
             json={
-                "ciphertext": test_data["ciphertext"],
-                "iv": test_data["iv"],
-                "auth_tag": test_data["auth_tag"],
-                "edit_token": test_data["edit_token"],
-                "decrypt_token": test_data["decrypt_token"],
+                "ciphertext": test_data.ciphertext,
+                "iv": test_data.iv,
+                "auth_tag": test_data.auth_tag,
+                "edit_token": test_data.edit_token,
+                "decrypt_token": test_data.decrypt_token,
                 "unlock_at": unlock_at,
                 "expires_at": expires_at,
                 # No pow_proof and no X-Capability-Token header
@@ -453,17 +441,18 @@ class TestSecretCreationWithToken:
         test_data = generate_test_data()
 
         # Invalid dates (expires_at before unlock_at)
-        unlock_at = (datetime.now(UTC) + timedelta(days=30)).isoformat()
-        expires_at = (datetime.now(UTC) + timedelta(hours=1)).isoformat()
+        now = datetime.now(UTC)
+        unlock_at = (now + timedelta(days=30)).isoformat()
+        expires_at = (now + timedelta(hours=1)).isoformat()
 
         response = client.post(
             "/api/v1/secrets",
             json={
-                "ciphertext": test_data["ciphertext"],
-                "iv": test_data["iv"],
-                "auth_tag": test_data["auth_tag"],
-                "edit_token": test_data["edit_token"],
-                "decrypt_token": test_data["decrypt_token"],
+                "ciphertext": test_data.ciphertext,
+                "iv": test_data.iv,
+                "auth_tag": test_data.auth_tag,
+                "edit_token": test_data.edit_token,
+                "decrypt_token": test_data.decrypt_token,
                 "unlock_at": unlock_at,
                 "expires_at": expires_at,
             },
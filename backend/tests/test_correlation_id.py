@@ -2,7 +2,6 @@
 
 from fastapi.testclient import TestClient
 
-import app.main as main_module
 from app.database import get_db
 from app.main import app
 from app.middleware.rate_limit import limiter
@@ -68,24 +67,24 @@ def test_correlation_id_on_unhandled_exception(db_session, monkeypatch):
 
     app.dependency_overrides[get_db] = override_get_db
     limiter.enabled = False
-    original_engine = main_module.engine
-    main_module.engine = db_session.get_bind()
 
     try:
-        with TestClient(app, raise_server_exceptions=False) as test_client:
-            response = test_client.get(
-                "/api/v1/secrets/retrieve",
-                headers={"Authorization": "Bearer " + "a" * 64},
-            )
-
-            assert response.status_code == 500
-            assert "X-Correlation-ID" in response.headers
-            assert len(response.headers["X-Correlation-ID"]) == 8
-            assert response.json()["detail"] == "Internal Server Error"
+        # Not entered as a context manager, so no lifespan runs: this request needs no
+        # startup work, and if the session-wide `app_client` has already started the
+        # app, a second lifespan would start the scheduler twice.
+        test_client = TestClient(app, raise_server_exceptions=False)
+        response = test_client.get(
+            "/api/v1/secrets/retrieve",
+            headers={"Authorization": "Bearer " + "a" * 64},
+        )
+
+        assert response.status_code == 500
+        assert "X-Correlation-ID" in response.headers
+        assert len(response.headers["X-Correlation-ID"]) == 8
+        assert response.json()["detail"] == "Internal Server Error"
     finally:
         app.dependency_overrides.clear()
         limiter.enabled = True
-        main_module.engine = original_engine
 
 
 def test_correlation_ids_unique_across_requests(client):
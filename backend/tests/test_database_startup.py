@@ -4,11 +4,9 @@ These tests verify that the application handles database state correctly,
 particularly when migrations haven't been run.
 """
 
-import os
-import tempfile
-
 import pytest
 from sqlalchemy import create_engine, inspect
+from sqlalchemy.pool import StaticPool
 
 
 class TestDatabaseStartup:
@@ -23,16 +21,14 @@ class TestDatabaseStartup:
         """
         from app.main import check_database_tables
 
-        with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as tmp:
-            empty_db_path = tmp.name
+        # Create an empty database (no tables)
+        empty_engine = create_engine(
+            "sqlite:///:memory:",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
 
         try:
-            # Create an empty database (no tables)
-            empty_engine = create_engine(
-                f"sqlite:///{empty_db_path}",
-                connect_args={"check_same_thread": False},
-            )
-
             # Verify it's empty
             inspector = inspect(empty_engine)
             assert len(inspector.get_table_names()) == 0
@@ -54,8 +50,7 @@ class TestDatabaseStartup:
                 main_module.engine = original_engine
 
         finally:
-            if os.path.exists(empty_db_path):
-                os.unlink(empty_db_path)
+            empty_engine.dispose()
 
     def test_check_database_tables_passes_with_all_tables(self, db_session):
         """
@@ -86,3 +81,22 @@ class TestDatabaseStartup:
         assert required_tables.issubset(
             tables
         ), f"Missing required tables. Expected: {required_tables}, Found: {tables}"
+
+
+class TestConnectArgs:
+    """Tests for driver-specific engine connect arguments."""
+
+    def test_sqlite_disables_same_thread_check(self):
+        from app.database import get_connect_args
+
+        assert get_connect_args("sqlite:///./secrets.db") == {"check_same_thread": False}
+
+    def test_psycopg_enables_prepared_statements(self):
+        from app.database import get_connect_args
+
+        assert get_connect_args("postgresql+psycopg://u:p@db/ieomd") == {"prepare_threshold": 1}
+
+    def test_other_drivers_get_no_extra_args(self):
+        from app.database import get_connect_args
+
+        assert get_connect_args("postgresql+psycopg2://u:p@db/ieomd") == {}
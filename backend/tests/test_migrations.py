@@ -1,7 +1,7 @@
 import tempfile
 from pathlib import Path
 
-from sqlalchemy import create_engine, inspect
+from sqlalchemy import create_engine, inspect, text
 
 import app.config as config_module
 from alembic import command
@@ -30,3 +30,60 @@ def test_alembic_upgrade_head_on_fresh_sqlite_db():
             assert {"secrets", "pow_challenges"}.issubset(tables)
     finally:
         config_module.settings.database_url = original_database_url
+
+
+def test_alembic_packs_iv_and_auth_tag_into_aead_header():
+    original_database_url = config_module.settings.database_url
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = Path(tmpdir) / "packed.db"
+            database_url = f"sqlite:///{db_path}"
+
+            config_module.settings.database_url = database_url
+
+            alembic_cfg = Config("alembic.ini")
+            command.upgrade(alembic_cfg, "0003")
+
+            engine = create_engine(
+                database_url,
+                connect_args={"check_same_thread": False},
+            )
+            iv = bytes(range(12))
+            auth_tag = bytes(range(100, 116))
+            with engine.begin() as connection:
+                connection.execute(
+                    text(
+                        "INSERT INTO secrets (id, edit_token_prefix, decrypt_token_prefix, "
+                        "edit_token_hash, decrypt_token_hash, ciphertext, iv, auth_tag, "
+                        "unlock_at, expires_at, created_at, ciphertext_size, is_deleted) "
+                        "VALUES ('s1', 'e', 'd', 'eh', 'dh', :ct, :iv, :tag, "
+                        "'2030-01-01 00:00:00', '2030-01-02 00:00:00', "
+                        "'2026-01-01 00:00:00', 3, 0)"
+                    ),
+                    {"ct": b"abc", "iv": iv, "tag": auth_tag},
+                )
+
+            command.upgrade(alembic_cfg, "head")
+
+            columns = {c["name"] for c in inspect(engine).get_columns("secrets")}
+            assert "aead_header" in columns
+            assert "iv" not in columns
+            assert "auth_tag" not in columns
+
+            with engine.connect() as connection:
+                header = connection.execute(
+                    text("SELECT aead_header FROM secrets WHERE id = 's1'")
+                ).scalar_one()
+            assert header == iv + auth_tag
+
+            command.downgrade(alembic_cfg, "0003")
+
+            with engine.connect() as connection:
+                row = connection.execute(
+                    text("SELECT iv, auth_tag FROM secrets WHERE id = 's1'")
+                ).one()
+            assert row.iv == iv
+            assert row.auth_tag == auth_tag
+            engine.dispose()
+    finally:
+        config_module.settings.database_url = original_database_url
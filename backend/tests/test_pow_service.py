@@ -1,12 +1,17 @@
 """Tests for the PoW service functions."""
 
+import hashlib
 from datetime import timedelta
 
 import pytest
 
 from app.models.challenge import Challenge
-from app.services.pow_service import cleanup_expired_challenges, generate_challenge
-from tests.test_utils import utcnow
+from app.services.pow_service import (
+    cleanup_expired_challenges,
+    generate_challenge,
+    validate_pow,
+)
+from tests.test_utils import solve_pow, utcnow
 
 
 @pytest.fixture
@@ -91,3 +96,32 @@ class TestCleanupExpiredChallenges:
         # Verify it was not deleted (cleanup only targets expired, not used)
         assert deleted_count == 0
         assert db_session.query(Challenge).filter(Challenge.id == challenge.id).first() is not None
+
+
+class TestValidatePow:
+    """Tests for the proof-of-work difficulty check in validate_pow."""
+
+    def test_accepts_solved_counter(self, db_session, sample_payload_hash):
+        """A counter whose hash meets the target is accepted."""
+        challenge = generate_challenge(db_session, sample_payload_hash, 100)
+        counter = solve_pow(challenge.nonce, challenge.difficulty, sample_payload_hash)
+
+        validated = validate_pow(
+            db_session, challenge.id, challenge.nonce, counter, sample_payload_hash
+        )
+
+        assert validated.id == challenge.id
+
+    def test_rejects_insufficient_work(self, db_session, sample_payload_hash):
+        """A counter whose hash is at or above the target is rejected."""
+        challenge = generate_challenge(db_session, sample_payload_hash, 100)
+        target = 2 ** (256 - challenge.difficulty)
+
+        def hash_int(counter):
+            preimage = f"{challenge.nonce}{counter:016x}{sample_payload_hash}"
+            return int.from_bytes(hashlib.sha256(preimage.encode()).digest(), "big")
+
+        counter = next(c for c in range(1000) if hash_int(c) >= target)
+
+        with pytest.raises(ValueError, match="Insufficient proof of work"):
+            validate_pow(db_session, challenge.id, challenge.nonce, counter, sample_payload_hash)
@@ -38,8 +38,9 @@ class TestClearExpiredSecrets:
         ciphertext = base64.b64encode(secrets.token_bytes(100)).decode()
 
         # Create an expired secret (expires in the past)
-        unlock_at = utcnow() + timedelta(hours=1)
-        expires_at = utcnow() - timedelta(hours=1)  # Already expired
+        now = utcnow()
+        unlock_at = now + timedelta(hours=1)
+        expires_at = now - timedelta(hours=1)  # Already expired
         expired_secret = create_secret(
             db=db_session,
             ciphertext_b64=ciphertext,
@@ -63,6 +64,7 @@ class TestClearExpiredSecrets:
         db_session.refresh(expired_secret)
         assert expired_secret.cleared_at is not None
         assert expired_secret.ciphertext is None
+        assert expired_secret.aead_header is None
         assert expired_secret.iv is None
         assert expired_secret.auth_tag is None
         # Metadata should be preserved (row not deleted)
@@ -79,8 +81,9 @@ class TestClearExpiredSecrets:
         ciphertext = base64.b64encode(secrets.token_bytes(100)).decode()
 
         # Create a secret that has been retrieved (not yet expired)
-        unlock_at = utcnow() - timedelta(hours=1)
-        expires_at = utcnow() + timedelta(days=30)  # Not expired
+        now = utcnow()
+        unlock_at = now - timedelta(hours=1)
+        expires_at = now + timedelta(days=30)  # Not expired
         retrieved_secret = create_secret(
             db=db_session,
             ciphertext_b64=ciphertext,
@@ -93,7 +96,7 @@ class TestClearExpiredSecrets:
         )
 
         # Mark as retrieved (simulating what retrieve_secret does)
-        retrieved_secret.retrieved_at = utcnow() - timedelta(minutes=30)
+        retrieved_secret.retrieved_at = now - timedelta(minutes=30)
         retrieved_secret.is_deleted = True
         db_session.commit()
 
@@ -123,8 +126,9 @@ class TestClearExpiredSecrets:
         ciphertext = base64.b64encode(secrets.token_bytes(100)).decode()
 
         # Create a non-expired, non-retrieved secret
-        unlock_at = utcnow() + timedelta(hours=1)
-        expires_at = utcnow() + timedelta(days=2)  # Not expired
+        now = utcnow()
+        unlock_at = now + timedelta(hours=1)
+        expires_at = now + timedelta(days=2)  # Not expired
         active_secret = create_secret(
             db=db_session,
             ciphertext_b64=ciphertext,
@@ -153,8 +157,9 @@ class TestClearExpiredSecrets:
         ciphertext = base64.b64encode(secrets.token_bytes(100)).decode()
 
         # Create an expired secret
-        unlock_at = utcnow() + timedelta(hours=1)
-        expires_at = utcnow() - timedelta(hours=1)  # Already expired
+        now = utcnow()
+        unlock_at = now + timedelta(hours=1)
+        expires_at = now - timedelta(hours=1)  # Already expired
         expired_secret = create_secret(
             db=db_session,
             ciphertext_b64=ciphertext,
@@ -180,6 +185,36 @@ class TestClearExpiredSecrets:
         db_session.refresh(expired_secret)
         assert expired_secret.cleared_at == first_cleared_at
 
+    def test_clear_just_expired_secret_with_subsecond_precision(self, db_session, sample_tokens):
+        """Test that a secret expired under a second ago is cleared with a precise stamp."""
+        # Create test data
+        iv = base64.b64encode(secrets.token_bytes(12)).decode()
+        auth_tag = base64.b64encode(secrets.token_bytes(16)).decode()
+        ciphertext = base64.b64encode(secrets.token_bytes(100)).decode()
+
+        # Create a secret that expired 200ms ago
+        now = utcnow()
+        expired_secret = create_secret(
+            db=db_session,
+            ciphertext_b64=ciphertext,
+            iv_b64=iv,
+            auth_tag_b64=auth_tag,
+            unlock_at=now + timedelta(hours=1),
+            edit_token=sample_tokens["edit_token"],
+            decrypt_token=sample_tokens["decrypt_token"],
+            expires_at=now - timedelta(milliseconds=200),
+        )
+
+        before = utcnow()
+        cleared_count = clear_expired_secrets(db_session)
+        after = utcnow()
+
+        assert cleared_count == 1
+        db_session.refresh(expired_secret)
+        assert expired_secret.ciphertext is None
+        # cleared_at keeps microseconds: a whole-second stamp would fall before `before`
+        assert before <= expired_secret.cleared_at <= after
+
 
 class TestTokenPrefixLookup:
     """Tests for token prefix-based O(1) lookup."""
@@ -197,15 +232,16 @@ class TestTokenPrefixLookup:
         auth_tag = base64.b64encode(secrets.token_bytes(16)).decode()
         ciphertext = base64.b64encode(secrets.token_bytes(100)).decode()
 
+        now = utcnow()
         secret = create_secret(
             db=db_session,
             ciphertext_b64=ciphertext,
             iv_b64=iv,
             auth_tag_b64=auth_tag,
-            unlock_at=utcnow() + timedelta(hours=1),
+            unlock_at=now + timedelta(hours=1),
             edit_token=sample_tokens["edit_token"],
             decrypt_token=sample_tokens["decrypt_token"],
-            expires_at=utcnow() + timedelta(days=7),
+            expires_at=now + timedelta(days=7),
         )
 
         # Verify prefixes are stored correctly
@@ -218,15 +254,16 @@ class TestTokenPrefixLookup:
         auth_tag = base64.b64encode(secrets.token_bytes(16)).decode()
         ciphertext = base64.b64encode(secrets.token_bytes(100)).decode()
 
+        now = utcnow()
         created = create_secret(
             db=db_session,
             ciphertext_b64=ciphertext,
             iv_b64=iv,
             auth_tag_b64=auth_tag,
-            unlock_at=utcnow() + timedelta(hours=1),
+            unlock_at=now + timedelta(hours=1),
             edit_token=sample_tokens["edit_token"],
             decrypt_token=sample_tokens["decrypt_token"],
-            expires_at=utcnow() + timedelta(days=7),
+            expires_at=now + timedelta(days=7),
         )
 
         # Find by edit token
@@ -245,15 +282,16 @@ class TestTokenPrefixLookup:
         auth_tag = base64.b64encode(secrets.token_bytes(16)).decode()
         ciphertext = base64.b64encode(secrets.token_bytes(100)).decode()
 
+        now = utcnow()
         created = create_secret(
             db=db_session,
             ciphertext_b64=ciphertext,
             iv_b64=iv,
             auth_tag_b64=auth_tag,
-            unlock_at=utcnow() + timedelta(hours=1),
+            unlock_at=now + timedelta(hours=1),
             edit_token=sample_tokens["edit_token"],
             decrypt_token=sample_tokens["decrypt_token"],
-            expires_at=utcnow() + timedelta(days=7),
+            expires_at=now + timedelta(days=7),
         )
 
         # Find by decrypt token
@@ -272,15 +310,16 @@ class TestTokenPrefixLookup:
         auth_tag = base64.b64encode(secrets.token_bytes(16)).decode()
         ciphertext = base64.b64encode(secrets.token_bytes(100)).decode()
 
+        now = utcnow()
         secret = create_secret(
             db=db_session,
             ciphertext_b64=ciphertext,
             iv_b64=iv,
             auth_tag_b64=auth_tag,
-            unlock_at=utcnow() + timedelta(hours=1),
+            unlock_at=now + timedelta(hours=1),
             edit_token=sample_tokens["edit_token"],
             decrypt_token=sample_tokens["decrypt_token"],
-            expires_at=utcnow() + timedelta(days=7),
+            expires_at=now + timedelta(days=7),
         )
 
         # Mark as deleted
@@ -294,6 +333,33 @@ class TestTokenPrefixLookup:
         assert found_by_decrypt is None
 
 
+class TestCreateSecret:
+    """Tests for the create_secret function."""
+
+    def test_create_secret_packs_aead_header(self, db_session, sample_tokens):
+        """Test that iv and auth_tag are stored packed in aead_header."""
+        iv_bytes = secrets.token_bytes(12)
+        auth_tag_bytes = secrets.token_bytes(16)
+        ciphertext = base64.b64encode(secrets.token_bytes(100)).decode()
+
+        now = utcnow()
+        secret = create_secret(
+            db=db_session,
+            ciphertext_b64=ciphertext,
+            iv_b64=base64.b64encode(iv_bytes).decode(),
+            auth_tag_b64=base64.b64encode(auth_tag_bytes).decode(),
+            unlock_at=now + timedelta(hours=1),
+            edit_token=sample_tokens["edit_token"],
+            decrypt_token=sample_tokens["decrypt_token"],
+            expires_at=now + timedelta(days=7),
+        )
+
+        db_session.refresh(secret)
+        assert secret.aead_header == iv_bytes + auth_tag_bytes
+        assert secret.iv == iv_bytes
+        assert secret.auth_tag == auth_tag_bytes
+
+
 class TestRetrieveSecret:
     """Tests for the retrieve_secret function."""
 
@@ -304,15 +370,16 @@ class TestRetrieveSecret:
         ciphertext = base64.b64encode(secrets.token_bytes(100)).decode()
 
         # Create an unlocked secret (unlock_at in the past)
+        now = utcnow()
         secret = create_secret(
             db=db_session,
             ciphertext_b64=ciphertext,
             iv_b64=iv,
             auth_tag_b64=auth_tag,
-            unlock_at=utcnow() - timedelta(hours=1),
+            unlock_at=now - timedelta(hours=1),
             edit_token=sample_tokens["edit_token"],
             decrypt_token=sample_tokens["decrypt_token"],
-            expires_at=utcnow() + timedelta(days=7),
+            expires_at=now + timedelta(days=7),
         )
 
         # Verify ciphertext exists before retrieval
@@ -333,6 +400,7 @@ class TestRetrieveSecret:
         # Verify ciphertext is cleared immediately (in same transaction)
         db_session.refresh(secret)
         assert secret.ciphertext is None
+        assert secret.aead_header is None
         assert secret.iv is None
         assert secret.auth_tag is None
         assert secret.cleared_at is not None
@@ -345,15 +413,16 @@ class TestRetrieveSecret:
         auth_tag = base64.b64encode(secrets.token_bytes(16)).decode()
         ciphertext = base64.b64encode(secrets.token_bytes(100)).decode()
 
+        now = utcnow()
         secret = create_secret(
             db=db_session,
             ciphertext_b64=ciphertext,
             iv_b64=iv,
             auth_tag_b64=auth_tag,
-            unlock_at=utcnow() - timedelta(hours=1),
+            unlock_at=now - timedelta(hours=1),
             edit_token=sample_tokens["edit_token"],
             decrypt_token=sample_tokens["decrypt_token"],
-            expires_at=utcnow() + timedelta(days=7),
+            expires_at=now + timedelta(days=7),
         )
 
         # First retrieval
@@ -370,15 +439,16 @@ class TestRetrieveSecret:
         auth_tag = base64.b64encode(secrets.token_bytes(16)).decode()
         ciphertext = base64.b64encode(secrets.token_bytes(100)).decode()
 
+        now = utcnow()
         secret = create_secret(
             db=db_session,
             ciphertext_b64=ciphertext,
             iv_b64=iv,
             auth_tag_b64=auth_tag,
-            unlock_at=utcnow() + timedelta(hours=1),  # Future unlock
+            unlock_at=now + timedelta(hours=1),  # Future unlock
             edit_token=sample_tokens["edit_token"],
             decrypt_token=sample_tokens["decrypt_token"],
-            expires_at=utcnow() + timedelta(days=7),
+            expires_at=now + timedelta(days=7),
         )
 
         result = retrieve_secret(db_session, secret)
@@ -394,15 +464,16 @@ class TestRetrieveSecret:
         auth_tag = base64.b64encode(secrets.token_bytes(16)).decode()
         ciphertext = base64.b64encode(secrets.token_bytes(100)).decode()
 
+        now = utcnow()
         secret = create_secret(
             db=db_session,
             ciphertext_b64=ciphertext,
             iv_b64=iv,
             auth_tag_b64=auth_tag,
-            unlock_at=utcnow() - timedelta(days=2),
+            unlock_at=now - timedelta(days=2),
             edit_token=sample_tokens["edit_token"],
             decrypt_token=sample_tokens["decrypt_token"],
-            expires_at=utcnow() - timedelta(hours=1),  # Already expired
+            expires_at=now - timedelta(hours=1),  # Already expired
         )
 
         result = retrieve_secret(db_session, secret)
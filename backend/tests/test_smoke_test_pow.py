@@ -0,0 +1,40 @@
+"""Tests for the parallel PoW solver in scripts/smoke-test.py."""
+
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+SMOKE_TEST_PATH = Path(__file__).resolve().parents[2] / "scripts" / "smoke-test.py"
+
+
+@pytest.fixture(scope="module")
+def smoke_test():
+    """Load the smoke-test script as a module (its file name isn't importable)."""
+    spec = importlib.util.spec_from_file_location("smoke_test", SMOKE_TEST_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class TestSmokeTestSolvePow:
+    """Tests for the smoke test's sharded solve_pow."""
+
+    def test_matches_serial_search(self, smoke_test, monkeypatch):
+        """The parallel solver returns the smallest winning counter, like a serial scan."""
+        nonce = "ab" * 32
+        payload_hash = "cd" * 32
+        difficulty = 12
+        # Several strided workers and tiny rounds, so the winner lands many rounds in.
+        # Threads stand in for worker processes: this checks the round and stride logic,
+        # and threads don't depend on the multiprocessing start method.
+        monkeypatch.setattr(smoke_test, "ProcessPoolExecutor", ThreadPoolExecutor)
+        monkeypatch.setattr(smoke_test.os, "cpu_count", lambda: 4)
+        monkeypatch.setattr(smoke_test, "POW_SHARD_SIZE", 64)
+        monkeypatch.setattr(smoke_test, "log", lambda *args, **kwargs: None)
+
+        serial = smoke_test._scan_pow_shard(nonce, payload_hash, difficulty, 0, 1 << 24, 1)
+
+        assert serial is not None
+        assert smoke_test.solve_pow(nonce, payload_hash, difficulty) == serial
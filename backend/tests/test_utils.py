@@ -1,8 +1,119 @@
 """Shared test utilities."""
 
+import base64
+import hashlib
+import secrets
+from dataclasses import dataclass
 from datetime import UTC, datetime
+from functools import cached_property
 
 
 def utcnow():
     """Get current UTC time as naive datetime."""
     return datetime.now(UTC).replace(tzinfo=None)
+
+
+def api_datetime(dt):
+    """Format a naive UTC datetime the way the API returns it (whole seconds, 'Z' suffix)."""
+    return dt.replace(microsecond=0).isoformat() + "Z"
+
+
+@dataclass
+class TestPayload:
+    """Fake client-encrypted payload; base64 forms are encoded on first access."""
+
+    __test__ = False  # not a pytest test class
+
+    ciphertext_bytes: bytes
+    iv_bytes: bytes
+    auth_tag_bytes: bytes
+    edit_token: str
+    decrypt_token: str
+
+    @cached_property
+    def ciphertext(self) -> str:
+        return base64.b64encode(self.ciphertext_bytes).decode()
+
+    @cached_property
+    def iv(self) -> str:
+        return base64.b64encode(self.iv_bytes).decode()
+
+    @cached_property
+    def auth_tag(self) -> str:
+        return base64.b64encode(self.auth_tag_bytes).decode()
+
+    @cached_property
+    def payload_hash(self) -> str:
+        return compute_payload_hash(self.ciphertext_bytes, self.iv_bytes, self.auth_tag_bytes)
+
+
+def generate_test_data(size: int = 100) -> TestPayload:
+    """Generate test cryptographic data with a `size`-byte fake ciphertext."""
+    # Simulating what the frontend would generate; one draw is sliced into every field.
+    raw = secrets.token_bytes(12 + 16 + 32 + 32 + size)
+    return TestPayload(
+        iv_bytes=raw[:12],
+        auth_tag_bytes=raw[12:28],
+        edit_token=raw[28:60].hex(),
+        decrypt_token=raw[60:92].hex(),
+        ciphertext_bytes=raw[92:],  # Fake ciphertext
+    )
+
+
+def compute_payload_hash(ciphertext: bytes, iv: bytes, auth_tag: bytes) -> str:
+    """Compute SHA256 hash of payload for PoW binding."""
+    sha = hashlib.sha256(ciphertext)
+    sha.update(iv)
+    sha.update(auth_tag)
+    return sha.hexdigest()
+
+
+def _increment_hex_counter(buf: bytearray) -> None:
+    """Add one to the 16-char lowercase hex counter at buf[:16], in place."""
+    i = 15
+    while buf[i] == 0x66:  # "f" rolls over to "0" and carries
+        buf[i] = 0x30
+        i -= 1
+    buf[i] = 0x61 if buf[i] == 0x39 else buf[i] + 1  # "9" -> "a"
+
+
+def solve_pow(nonce: str, difficulty: int, payload_hash: str) -> int:
+    """Solve proof-of-work challenge. Returns winning counter."""
+    # Big-endian digests order like the integers they encode, so the server's
+    # int(hash) < 2 ** (256 - difficulty) check is a single bytes comparison.
+    target = (1 << (256 - difficulty)).to_bytes(32, "big")
+
+    # Preimage is nonce || counter (16 hex chars) || payload_hash. The nonce is one
+    # full SHA-256 block, so absorb it once and copy that midstate per attempt.
+    midstate = hashlib.sha256(nonce.encode())
+
+    # Preformatted tail; the counter slot is bumped in place rather than reformatted.
+    tail = bytearray(f"{0:016x}{payload_hash}".encode())
+
+    for counter in range(10_000_000):  # Should find solution within this range
+        sha = midstate.copy()
+        sha.update(tail)
+        if sha.digest() < target:
+            return counter
+
+        _increment_hex_counter(tail)
+
+    raise RuntimeError("Failed to solve PoW within iteration limit")
+
+
+def secret_body(payload, challenge, counter, **fields):
+    """POST /api/v1/secrets body for `payload` with its PoW proof, plus any extra `fields`."""
+    return {
+        "ciphertext": payload.ciphertext,
+        "iv": payload.iv,
+        "auth_tag": payload.auth_tag,
+        "edit_token": payload.edit_token,
+        "decrypt_token": payload.decrypt_token,
+        "pow_proof": {
+            "challenge_id": challenge["challenge_id"],
+            "nonce": challenge["nonce"],
+            "counter": counter,
+            "payload_hash": payload.payload_hash,
+        },
+        **fields,
+    }